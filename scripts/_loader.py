@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Shared ingest for the pipeline scripts.
+
+Owns the raw-file paths, the column/type catalogue, and the Parquet cache:
+the first script to run streams the pipe-delimited CSV batch-by-batch into
+data/processed/employment.parquet, and every later run (either script)
+reads the typed, already-cleaned cache instead of re-parsing 780MB of CSV.
+"""
+
+import os
+
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet as pq
+from pathlib import Path
+
+# Paths
+RAW_DATA_PATH = Path('/mnt/c/Users/chipp/Downloads/employment_202511_1_2026-01-21.csv')
+PROCESSED_DATA_PATH = Path(__file__).parent.parent / 'data' / 'processed'
+CACHE_PATH = PROCESSED_DATA_PATH / 'employment.parquet'
+
+# Every column either script touches, with its pandas-style dtype. The cache
+# always holds this full set so whichever script runs first builds a cache
+# the other can reuse; each script selects its own subset via raw_view().
+CACHE_DTYPE_MAP = {
+    'age_bracket': 'category',
+    'agency': 'category',
+    'agency_code': 'category',
+    'agency_subelement': 'category',
+    'annualized_adjusted_basic_pay': 'float32',
+    'appointment_type': 'category',
+    'count': 'int32',
+    'duty_station_state': 'category',
+    'duty_station_state_abbreviation': 'category',
+    'education_level': 'category',
+    'grade': 'object',
+    'length_of_service_years': 'float32',
+    'occupational_group': 'category',
+    'occupational_series': 'category',
+    'pay_plan': 'category',
+    'snapshot_yyyymm': 'int32',
+    'stem_occupation': 'category',
+    'supervisory_status': 'category',
+    'work_schedule': 'category',
+}
+
+# PyArrow equivalents of the pandas dtypes above ('category' becomes a
+# dictionary-encoded string column)
+ARROW_TYPES = {
+    'category': pa.dictionary(pa.int32(), pa.string()),
+    'object': pa.string(),
+    'int32': pa.int32(),
+    'float32': pa.float32(),
+}
+
+
+def ensure_cache():
+    """Build the Parquet cache from the raw CSV if it doesn't exist yet.
+
+    The CSV is streamed batch-by-batch straight into the Parquet writer, so
+    conversion peaks at one in-flight batch rather than a full table.
+    REDACTED values parse to null; string columns are unaffected
+    (strings_can_be_null stays False).
+    """
+    PROCESSED_DATA_PATH.mkdir(parents=True, exist_ok=True)
+    if CACHE_PATH.exists():
+        print(f"Using cached parquet: {CACHE_PATH}")
+        return CACHE_PATH
+    reader = pa.csv.open_csv(
+        str(RAW_DATA_PATH),
+        read_options=pa.csv.ReadOptions(block_size=64 << 20, use_threads=True),
+        parse_options=pa.csv.ParseOptions(delimiter='|'),
+        convert_options=pa.csv.ConvertOptions(
+            column_types={col: ARROW_TYPES[dt] for col, dt in CACHE_DTYPE_MAP.items()},
+            include_columns=list(CACHE_DTYPE_MAP),
+            null_values=['', 'REDACTED'],
+        ),
+    )
+    # Write to a temp path and rename only once the reader is fully
+    # drained: an interrupted run would otherwise leave a truncated file
+    # with a valid Parquet footer that every later run silently trusts.
+    tmp_path = CACHE_PATH.with_suffix('.parquet.tmp')
+    try:
+        with pq.ParquetWriter(tmp_path, reader.schema, compression='snappy') as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, CACHE_PATH)
+    print(f"Wrote parquet cache: {CACHE_PATH}")
+    return CACHE_PATH
+
+
+def raw_view(con, columns, name='raw'):
+    """Expose the cached dataset to a DuckDB connection as a view.
+
+    Only `columns` are selected, so DuckDB's Parquet scan prunes the other
+    column chunks entirely and each script pays only for the columns it
+    aggregates.
+    """
+    ensure_cache()
+    col_list = ', '.join(f'"{col}"' for col in columns)
+    con.execute(f"CREATE VIEW {name} AS SELECT {col_list} FROM read_parquet('{CACHE_PATH}')")
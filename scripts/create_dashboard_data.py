@@ -4,154 +4,200 @@ Create clean aggregated data and generate a professional dashboard with embedded
 """
 
 import pandas as pd
-import numpy as np
+import duckdb
 from pathlib import Path
-import json
+import gzip
+import orjson
+
+from _loader import raw_view
 
 # Paths
-RAW_DATA_PATH = Path('/mnt/c/Users/chipp/Downloads/employment_202511_1_2026-01-21.csv')
 OUTPUT_PATH = Path('/mnt/c/Users/chipp/federal-employment-analysis/dashboard')
 
 print("Loading data...")
-dtype_map = {
-    'age_bracket': 'category',
-    'agency': 'category',
-    'agency_code': 'category',
-    'agency_subelement': 'category',
-    'annualized_adjusted_basic_pay': 'object',
-    'appointment_type': 'category',
-    'count': 'int32',
-    'duty_station_state': 'category',
-    'duty_station_state_abbreviation': 'category',
-    'education_level': 'category',
-    'grade': 'object',
-    'length_of_service_years': 'float32',
-    'occupational_group': 'category',
-    'occupational_series': 'category',
-    'pay_plan': 'category',
-    'stem_occupation': 'category',
-    'supervisory_status': 'category',
-    'work_schedule': 'category'
-}
-
-df = pd.read_csv(RAW_DATA_PATH, sep='|', dtype=dtype_map, low_memory=False, usecols=list(dtype_map.keys()))
-print(f"Loaded {len(df):,} rows")
-
-# Clean data
-df['pay_numeric'] = pd.to_numeric(df['annualized_adjusted_basic_pay'], errors='coerce')
-df['grade_numeric'] = pd.to_numeric(df['grade'], errors='coerce')
+# Only the columns the summaries below actually touch; the shared cache
+# holds more (see _loader.CACHE_DTYPE_MAP) but the raw view prunes the rest
+RAW_COLUMNS = [
+    'age_bracket',
+    'agency',
+    'annualized_adjusted_basic_pay',
+    'appointment_type',
+    'count',
+    'duty_station_state',
+    'duty_station_state_abbreviation',
+    'education_level',
+    'grade',
+    'length_of_service_years',
+    'stem_occupation',
+    'supervisory_status',
+]
+
+# All the summaries below are aggregations over the same table, so run them
+# through DuckDB: materialize the cleaned columns once, then every GROUP BY
+# is a parallel hash aggregation over the same columnar buffers instead of
+# a separate pandas groupby that rescans the whole DataFrame.
+con = duckdb.connect()
+raw_view(con, RAW_COLUMNS)
+con.execute("""
+    CREATE TABLE emp AS
+    SELECT *,
+           CAST(annualized_adjusted_basic_pay AS DOUBLE) AS pay_numeric,
+           TRY_CAST(TRY_CAST(grade AS DOUBLE) AS TINYINT) AS grade_numeric,
+           CASE
+               WHEN pay_numeric IS NULL THEN 'Redacted'
+               WHEN pay_numeric < 50000 THEN 'Under $50K'
+               WHEN pay_numeric < 75000 THEN '$50K-$75K'
+               WHEN pay_numeric < 100000 THEN '$75K-$100K'
+               WHEN pay_numeric < 125000 THEN '$100K-$125K'
+               WHEN pay_numeric < 150000 THEN '$125K-$150K'
+               WHEN pay_numeric < 200000 THEN '$150K-$200K'
+               ELSE '$200K+'
+           END AS pay_band
+    FROM raw
+""")
+print(f"Loaded {con.execute('SELECT COUNT(*) FROM emp').fetchone()[0]:,} rows")
 
 # Agency summary - aggregate by agency name only, filter zeros
 print("Creating agency summary...")
-agency_data = df.groupby('agency', observed=True).agg({
-    'count': 'sum',
-    'pay_numeric': ['mean', 'median'],
-    'length_of_service_years': 'mean',
-    'grade_numeric': 'mean'
-}).round(2)
-agency_data.columns = ['employees', 'avg_pay', 'median_pay', 'avg_tenure', 'avg_grade']
-agency_data = agency_data[agency_data['employees'] > 0].reset_index()
-agency_data = agency_data.sort_values('employees', ascending=False)
+agency_data = con.execute("""
+    SELECT agency,
+           CAST(SUM("count") AS BIGINT) AS employees,
+           ROUND(AVG(pay_numeric), 2) AS avg_pay,
+           ROUND(MEDIAN(pay_numeric), 2) AS median_pay,
+           ROUND(AVG(length_of_service_years), 2) AS avg_tenure,
+           ROUND(AVG(grade_numeric), 2) AS avg_grade,
+           COUNT(pay_numeric) AS n_pay,
+           COUNT(length_of_service_years) AS n_ten
+    FROM emp
+    GROUP BY agency
+    HAVING employees > 0
+    ORDER BY employees DESC
+""").df()
 print(f"  {len(agency_data)} agencies with employees")
 
-# State summary
+# State summary (REDACTED duty stations excluded)
 print("Creating state summary...")
-state_data = df.groupby(['duty_station_state', 'duty_station_state_abbreviation'], observed=True).agg({
-    'count': 'sum',
-    'pay_numeric': ['mean', 'median'],
-    'length_of_service_years': 'mean'
-}).round(2)
-state_data.columns = ['employees', 'avg_pay', 'median_pay', 'avg_tenure']
-state_data = state_data[state_data['employees'] > 0].reset_index()
-state_data = state_data.sort_values('employees', ascending=False)
-# Filter out REDACTED
-state_data = state_data[state_data['duty_station_state'] != 'REDACTED']
+state_data = con.execute("""
+    SELECT duty_station_state,
+           duty_station_state_abbreviation,
+           CAST(SUM("count") AS BIGINT) AS employees,
+           ROUND(AVG(pay_numeric), 2) AS avg_pay,
+           ROUND(MEDIAN(pay_numeric), 2) AS median_pay,
+           ROUND(AVG(length_of_service_years), 2) AS avg_tenure
+    FROM emp
+    WHERE duty_station_state <> 'REDACTED'
+    GROUP BY duty_station_state, duty_station_state_abbreviation
+    HAVING employees > 0
+    ORDER BY employees DESC
+""").df()
 print(f"  {len(state_data)} states")
 
 # Pay distribution
 print("Creating pay distribution...")
-def pay_band(pay):
-    if pd.isna(pay): return 'Redacted'
-    elif pay < 50000: return 'Under $50K'
-    elif pay < 75000: return '$50K-$75K'
-    elif pay < 100000: return '$75K-$100K'
-    elif pay < 125000: return '$100K-$125K'
-    elif pay < 150000: return '$125K-$150K'
-    elif pay < 200000: return '$150K-$200K'
-    else: return '$200K+'
-
-df['pay_band'] = df['pay_numeric'].apply(pay_band)
-pay_dist = df.groupby('pay_band', observed=True)['count'].sum().reset_index()
-pay_dist.columns = ['band', 'employees']
-# Order properly
+pay_dist = con.execute("""
+    SELECT pay_band AS band,
+           CAST(SUM("count") AS BIGINT) AS employees
+    FROM emp
+    GROUP BY pay_band
+""").df()
+# Order properly -- an ordered categorical sorts on its int8 codes instead
+# of a Python list.index() scan per row
 band_order = ['Under $50K', '$50K-$75K', '$75K-$100K', '$100K-$125K', '$125K-$150K', '$150K-$200K', '$200K+', 'Redacted']
-pay_dist['order'] = pay_dist['band'].apply(lambda x: band_order.index(x) if x in band_order else 99)
-pay_dist = pay_dist.sort_values('order').drop('order', axis=1)
+band_order += sorted(set(pay_dist['band']) - set(band_order))  # unexpected labels sort last
+pay_dist['band'] = pd.Categorical(pay_dist['band'], categories=band_order, ordered=True)
+pay_dist = pay_dist.sort_values('band')
 
 # Education summary
 print("Creating education summary...")
-edu_data = df.groupby('education_level', observed=True).agg({
-    'count': 'sum',
-    'pay_numeric': 'mean'
-}).round(2)
-edu_data.columns = ['employees', 'avg_pay']
-edu_data = edu_data[edu_data['employees'] > 0].reset_index()
-edu_data = edu_data.sort_values('avg_pay', ascending=False)
+edu_data = con.execute("""
+    SELECT education_level,
+           CAST(SUM("count") AS BIGINT) AS employees,
+           ROUND(AVG(pay_numeric), 2) AS avg_pay
+    FROM emp
+    GROUP BY education_level
+    HAVING employees > 0
+    ORDER BY avg_pay DESC
+""").df()
 
 # Appointment type summary
 print("Creating appointment summary...")
-appt_data = df.groupby('appointment_type', observed=True).agg({
-    'count': 'sum',
-    'pay_numeric': 'mean',
-    'length_of_service_years': 'mean'
-}).round(2)
-appt_data.columns = ['employees', 'avg_pay', 'avg_tenure']
-appt_data = appt_data[appt_data['employees'] > 0].reset_index()
-appt_data = appt_data.sort_values('employees', ascending=False)
+appt_data = con.execute("""
+    SELECT appointment_type,
+           CAST(SUM("count") AS BIGINT) AS employees,
+           ROUND(AVG(pay_numeric), 2) AS avg_pay,
+           ROUND(AVG(length_of_service_years), 2) AS avg_tenure
+    FROM emp
+    GROUP BY appointment_type
+    HAVING employees > 0
+    ORDER BY employees DESC
+""").df()
 
 # Age bracket summary
 print("Creating age summary...")
-age_data = df.groupby('age_bracket', observed=True).agg({
-    'count': 'sum',
-    'pay_numeric': 'mean',
-    'length_of_service_years': 'mean'
-}).round(2)
-age_data.columns = ['employees', 'avg_pay', 'avg_tenure']
-age_data = age_data[age_data['employees'] > 0].reset_index()
-# Order age brackets
+age_data = con.execute("""
+    SELECT age_bracket,
+           CAST(SUM("count") AS BIGINT) AS employees,
+           ROUND(AVG(pay_numeric), 2) AS avg_pay,
+           ROUND(AVG(length_of_service_years), 2) AS avg_tenure
+    FROM emp
+    GROUP BY age_bracket
+""").df()
+# Order age brackets. SQL GROUP BY keeps a NULL group where the old pandas
+# groupby dropped NaN keys, and blank CSV cells survive as '' in string
+# columns (strings_can_be_null stays False) where pd.read_csv made NaN, so
+# drop both -- null can't be a categorical category and an unlabeled
+# bracket is useless in the chart anyway.
 age_order = ['LESS THAN 20', '20-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55-59', '60-64', '65 OR MORE']
-age_data['order'] = age_data['age_bracket'].apply(lambda x: age_order.index(x) if x in age_order else 99)
-age_data = age_data.sort_values('order').drop('order', axis=1)
+age_data = age_data[age_data['age_bracket'].notna() & (age_data['age_bracket'] != '')]
+age_order += sorted(set(age_data['age_bracket']) - set(age_order))  # unexpected labels sort last
+age_data['age_bracket'] = pd.Categorical(age_data['age_bracket'], categories=age_order, ordered=True)
+age_data = age_data.sort_values('age_bracket')
 
 # STEM comparison
 print("Creating STEM comparison...")
-stem_data = df.groupby('stem_occupation', observed=True).agg({
-    'count': 'sum',
-    'pay_numeric': 'mean',
-    'length_of_service_years': 'mean'
-}).round(2)
-stem_data.columns = ['employees', 'avg_pay', 'avg_tenure']
-stem_data = stem_data[stem_data['employees'] > 0].reset_index()
+stem_data = con.execute("""
+    SELECT stem_occupation,
+           CAST(SUM("count") AS BIGINT) AS employees,
+           ROUND(AVG(pay_numeric), 2) AS avg_pay,
+           ROUND(AVG(length_of_service_years), 2) AS avg_tenure
+    FROM emp
+    GROUP BY stem_occupation
+    HAVING employees > 0
+    ORDER BY stem_occupation
+""").df()
 
 # Supervisory status
 print("Creating supervisory summary...")
-super_data = df.groupby('supervisory_status', observed=True).agg({
-    'count': 'sum',
-    'pay_numeric': 'mean'
-}).round(2)
-super_data.columns = ['employees', 'avg_pay']
-super_data = super_data[super_data['employees'] > 0].reset_index()
-super_data = super_data.sort_values('employees', ascending=False)
-
-# Overall stats
+super_data = con.execute("""
+    SELECT supervisory_status,
+           CAST(SUM("count") AS BIGINT) AS employees,
+           ROUND(AVG(pay_numeric), 2) AS avg_pay
+    FROM emp
+    GROUP BY supervisory_status
+    HAVING employees > 0
+    ORDER BY employees DESC
+""").df()
+
+# Overall stats -- derived from the summaries already computed above rather
+# than rescanning the full table: totals are sums of the STEM group sums,
+# and the overall means are the agency means weighted by their non-null row
+# counts. Only the median still needs the raw column, so that stays as a
+# single-aggregate query.
+total_employees = int(stem_data['employees'].sum())
+stem_employees = int(stem_data.loc[stem_data['stem_occupation'] == 'STEM OCCUPATIONS', 'employees'].sum())
+avg_salary = (agency_data['avg_pay'] * agency_data['n_pay']).sum() / agency_data['n_pay'].sum()
+avg_tenure = (agency_data['avg_tenure'] * agency_data['n_ten']).sum() / agency_data['n_ten'].sum()
+median_salary = con.execute("SELECT MEDIAN(pay_numeric) FROM emp").fetchone()[0]
+# The weighting columns are only needed here, not in the dashboard payload
+agency_data = agency_data.drop(columns=['n_pay', 'n_ten'])
 overall = {
-    'total_employees': int(df['count'].sum()),
+    'total_employees': int(total_employees),
     'total_agencies': int(agency_data['agency'].nunique()),
     'total_states': len(state_data),
-    'avg_salary': round(float(df['pay_numeric'].mean()), 0),
-    'median_salary': round(float(df['pay_numeric'].median()), 0),
-    'avg_tenure': round(float(df['length_of_service_years'].mean()), 1),
-    'pct_stem': round(float(df[df['stem_occupation'] == 'STEM OCCUPATIONS']['count'].sum() / df['count'].sum() * 100), 1),
+    'avg_salary': round(float(avg_salary), 0),
+    'median_salary': round(float(median_salary), 0),
+    'avg_tenure': round(float(avg_tenure), 1),
+    'pct_stem': round(float(stem_employees / total_employees * 100), 1),
     'snapshot': 'November 2025'
 }
 
@@ -161,7 +207,7 @@ def df_to_json(dataframe):
 
 data = {
     'overall': overall,
-    'agencies': df_to_json(agency_data.head(50)),  # Top 50 for performance
+    'agencies': df_to_json(agency_data.nlargest(50, 'employees')),  # Top 50 for performance
     'allAgencies': df_to_json(agency_data),
     'states': df_to_json(state_data),
     'payDistribution': df_to_json(pay_dist),
@@ -172,14 +218,22 @@ data = {
     'supervisory': df_to_json(super_data)
 }
 
-# Save as JS file for embedding
+# Save as JS file for embedding. orjson's Rust encoder is several times
+# faster than stdlib json on a payload this shape, and it emits NaN as
+# null, which the dashboard's isNaN / "> 0" guards already handle.
 print("Writing data file...")
-with open(OUTPUT_PATH / 'data.js', 'w') as f:
-    f.write('const DASHBOARD_DATA = ')
-    json.dump(data, f)
-    f.write(';')
+body = b'const DASHBOARD_DATA = ' + orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY) + b';'
+(OUTPUT_PATH / 'data.js').write_bytes(body)
+# Also write a precompressed copy: the payload is mostly repeated record
+# keys, so it gzips ~6x smaller. Hosts that support precompressed assets
+# can serve data.js.gz with Content-Encoding: gzip; index.html keeps
+# loading the plain file everywhere else.
+with gzip.open(OUTPUT_PATH / 'data.js.gz', 'wb', compresslevel=9) as f:
+    f.write(body)
 
 print(f"\nData exported to {OUTPUT_PATH / 'data.js'}")
+print(f"  Sizes: data.js {len(body) / 1024:.0f} KB, "
+      f"data.js.gz {(OUTPUT_PATH / 'data.js.gz').stat().st_size / 1024:.0f} KB")
 print(f"  Agencies: {len(data['allAgencies'])}")
 print(f"  States: {len(data['states'])}")
 print(f"  Total employees: {overall['total_employees']:,}")
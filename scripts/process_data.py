@@ -4,174 +4,222 @@ Federal Employment Data Processing Script
 Processes the raw 780MB CSV and exports aggregated data for the dashboard.
 """
 
-import pandas as pd
-import numpy as np
-from pathlib import Path
+import duckdb
 import json
 import sys
 
-# Paths
-RAW_DATA_PATH = Path('/mnt/c/Users/chipp/Downloads/employment_202511_1_2026-01-21.csv')
-PROCESSED_DATA_PATH = Path(__file__).parent.parent / 'data' / 'processed'
+from _loader import RAW_DATA_PATH, PROCESSED_DATA_PATH, CACHE_PATH, raw_view
+
 PROCESSED_DATA_PATH.mkdir(parents=True, exist_ok=True)
 
 print("=" * 60)
 print("Federal Employment Data Processing")
 print("=" * 60)
 
-# Check if file exists
-if not RAW_DATA_PATH.exists():
+# Check if file exists (a parquet cache from an earlier run also works)
+if not RAW_DATA_PATH.exists() and not CACHE_PATH.exists():
     print(f"ERROR: Raw data file not found at {RAW_DATA_PATH}")
     sys.exit(1)
 
 print(f"\nSource file: {RAW_DATA_PATH}")
 print(f"Output directory: {PROCESSED_DATA_PATH}")
 
-# Define optimized dtypes
-dtype_map = {
-    'age_bracket': 'category',
-    'agency': 'category',
-    'agency_code': 'category',
-    'agency_subelement': 'category',
-    'agency_subelement_code': 'category',
-    'annualized_adjusted_basic_pay': 'object',
-    'appointment_type': 'category',
-    'appointment_type_code': 'category',
-    'count': 'int32',
-    'duty_station_country': 'category',
-    'duty_station_country_code': 'category',
-    'duty_station_state': 'category',
-    'duty_station_state_abbreviation': 'category',
-    'duty_station_state_code': 'category',
-    'education_level': 'category',
-    'education_level_code': 'category',
-    'grade': 'object',
-    'length_of_service_years': 'float32',
-    'occupational_group': 'category',
-    'occupational_group_code': 'category',
-    'occupational_series': 'category',
-    'occupational_series_code': 'category',
-    'pay_plan': 'category',
-    'pay_plan_code': 'category',
-    'snapshot_yyyymm': 'int32',
-    'stem_occupation': 'category',
-    'stem_occupation_type': 'category',
-    'supervisory_status': 'category',
-    'supervisory_status_code': 'category',
-    'work_schedule': 'category',
-    'work_schedule_code': 'category'
-}
+# Only the columns the exports below actually touch; the shared cache holds
+# more (see _loader.CACHE_DTYPE_MAP) but the raw view prunes the rest
+RAW_COLUMNS = [
+    'age_bracket',
+    'agency',
+    'agency_code',
+    'annualized_adjusted_basic_pay',
+    'appointment_type',
+    'count',
+    'duty_station_state',
+    'duty_station_state_abbreviation',
+    'education_level',
+    'grade',
+    'length_of_service_years',
+    'occupational_group',
+    'occupational_series',
+    'snapshot_yyyymm',
+    'stem_occupation',
+]
 
 print("\n[1/8] Loading data (this may take a moment for 780MB)...")
-df = pd.read_csv(RAW_DATA_PATH, sep='|', dtype=dtype_map, low_memory=False)
-print(f"      Loaded {len(df):,} rows and {len(df.columns)} columns")
-print(f"      Memory usage: {df.memory_usage(deep=True).sum() / 1024**2:.1f} MB")
+con = duckdb.connect()
+raw_view(con, RAW_COLUMNS)
 
 print("\n[2/8] Cleaning data...")
-# Convert pay to numeric
-df['pay_numeric'] = pd.to_numeric(df['annualized_adjusted_basic_pay'], errors='coerce')
-df['is_redacted'] = df['annualized_adjusted_basic_pay'] == 'REDACTED'
-df['grade_numeric'] = pd.to_numeric(df['grade'], errors='coerce')
-
-# Create tenure categories
-def categorize_tenure(years):
-    if pd.isna(years): return 'Unknown'
-    elif years < 1: return '< 1 year'
-    elif years < 5: return '1-5 years'
-    elif years < 10: return '5-10 years'
-    elif years < 20: return '10-20 years'
-    elif years < 30: return '20-30 years'
-    else: return '30+ years'
-
-df['tenure_category'] = df['length_of_service_years'].apply(categorize_tenure).astype('category')
-
-# Create pay bands
-def categorize_pay(pay):
-    if pd.isna(pay): return 'Unknown/Redacted'
-    elif pay < 40000: return '< $40K'
-    elif pay < 60000: return '$40K-$60K'
-    elif pay < 80000: return '$60K-$80K'
-    elif pay < 100000: return '$80K-$100K'
-    elif pay < 150000: return '$100K-$150K'
-    elif pay < 200000: return '$150K-$200K'
-    else: return '$200K+'
-
-df['pay_band'] = df['pay_numeric'].apply(categorize_pay).astype('category')
-
-print(f"      Records with salary: {df['pay_numeric'].notna().sum():,}")
-print(f"      Records REDACTED: {df['is_redacted'].sum():,}")
+# Pay is already float32 (REDACTED parsed as null at read time), so redacted
+# rows are exactly the nulls. grade's non-numeric sentinels (pay-plan codes)
+# are open-ended, so TRY_CAST coerces them to null; the numeric grades are
+# bounded GS values, so they land in a TINYINT at an eighth of the bytes of
+# a DOUBLE. The band CASEs mirror
+# the old bin_labels() edges exactly. Every export below is a parallel hash
+# aggregation over DuckDB's compressed columnar buffers, same pattern as
+# create_dashboard_data.py.
+con.execute("""
+    CREATE TABLE emp AS
+    SELECT * EXCLUDE (annualized_adjusted_basic_pay),
+           annualized_adjusted_basic_pay AS pay_numeric,
+           annualized_adjusted_basic_pay IS NULL AS is_redacted,
+           TRY_CAST(TRY_CAST(grade AS DOUBLE) AS TINYINT) AS grade_numeric,
+           CASE
+               WHEN length_of_service_years IS NULL THEN 'Unknown'
+               WHEN length_of_service_years < 1 THEN '< 1 year'
+               WHEN length_of_service_years < 5 THEN '1-5 years'
+               WHEN length_of_service_years < 10 THEN '5-10 years'
+               WHEN length_of_service_years < 20 THEN '10-20 years'
+               WHEN length_of_service_years < 30 THEN '20-30 years'
+               ELSE '30+ years'
+           END AS tenure_category,
+           CASE
+               WHEN annualized_adjusted_basic_pay IS NULL THEN 'Unknown/Redacted'
+               WHEN annualized_adjusted_basic_pay < 40000 THEN '< $40K'
+               WHEN annualized_adjusted_basic_pay < 60000 THEN '$40K-$60K'
+               WHEN annualized_adjusted_basic_pay < 80000 THEN '$60K-$80K'
+               WHEN annualized_adjusted_basic_pay < 100000 THEN '$80K-$100K'
+               WHEN annualized_adjusted_basic_pay < 150000 THEN '$100K-$150K'
+               WHEN annualized_adjusted_basic_pay < 200000 THEN '$150K-$200K'
+               ELSE '$200K+'
+           END AS pay_band
+    FROM raw
+""")
+# The raw file is already OPM's aggregated snapshot (each row is an
+# attribute combination with an occupancy count), so the sum/mean-only
+# exports below are marginal roll-ups of one much smaller cube. Averages
+# are carried as (sum, n) pairs so the roll-ups stay exact row-means.
+# The agency/state/occupation exports need medians and stddevs, which
+# don't compose from partial aggregates, so those keep querying emp.
+con.execute("""
+    CREATE TABLE cube AS
+    SELECT agency,
+           appointment_type,
+           age_bracket,
+           education_level,
+           tenure_category,
+           pay_band,
+           CAST(SUM("count") AS BIGINT) AS employees,
+           SUM(pay_numeric) AS pay_sum,
+           COUNT(pay_numeric) AS pay_n,
+           SUM(length_of_service_years) AS ten_sum,
+           COUNT(length_of_service_years) AS ten_n
+    FROM emp
+    GROUP BY ALL
+""")
+n_rows, n_redacted = con.execute(
+    "SELECT COUNT(*), SUM(CASE WHEN is_redacted THEN 1 ELSE 0 END) FROM emp"
+).fetchone()
+print(f"      Loaded {n_rows:,} rows")
+print(f"      Records with salary: {n_rows - n_redacted:,}")
+print(f"      Records REDACTED: {n_redacted:,}")
 
 print("\n[3/8] Exporting agency summary...")
-agency_export = df.groupby(['agency', 'agency_code']).agg({
-    'count': 'sum',
-    'pay_numeric': ['mean', 'median', 'std'],
-    'length_of_service_years': ['mean', 'median'],
-    'grade_numeric': 'mean',
-    'is_redacted': 'sum'
-}).round(2)
-agency_export.columns = ['_'.join(col).strip('_') for col in agency_export.columns]
-agency_export = agency_export.reset_index()
+agency_export = con.execute("""
+    SELECT agency,
+           agency_code,
+           CAST(SUM("count") AS BIGINT) AS count_sum,
+           ROUND(AVG(pay_numeric), 2) AS pay_numeric_mean,
+           ROUND(MEDIAN(pay_numeric), 2) AS pay_numeric_median,
+           ROUND(STDDEV_SAMP(pay_numeric), 2) AS pay_numeric_std,
+           ROUND(AVG(length_of_service_years), 2) AS length_of_service_years_mean,
+           ROUND(MEDIAN(length_of_service_years), 2) AS length_of_service_years_median,
+           ROUND(AVG(grade_numeric), 2) AS grade_numeric_mean,
+           CAST(SUM(CASE WHEN is_redacted THEN 1 ELSE 0 END) AS BIGINT) AS is_redacted_sum
+    FROM emp
+    GROUP BY agency, agency_code
+""").df()
 agency_export.to_csv(PROCESSED_DATA_PATH / 'agency_summary.csv', index=False)
 print(f"      {len(agency_export)} agencies")
 
 print("\n[4/8] Exporting state summary...")
-state_export = df.groupby(['duty_station_state', 'duty_station_state_abbreviation']).agg({
-    'count': 'sum',
-    'pay_numeric': ['mean', 'median'],
-    'length_of_service_years': 'mean'
-}).round(2)
-state_export.columns = ['_'.join(col).strip('_') for col in state_export.columns]
-state_export = state_export.reset_index()
+state_export = con.execute("""
+    SELECT duty_station_state,
+           duty_station_state_abbreviation,
+           CAST(SUM("count") AS BIGINT) AS count_sum,
+           ROUND(AVG(pay_numeric), 2) AS pay_numeric_mean,
+           ROUND(MEDIAN(pay_numeric), 2) AS pay_numeric_median,
+           ROUND(AVG(length_of_service_years), 2) AS length_of_service_years_mean
+    FROM emp
+    GROUP BY duty_station_state, duty_station_state_abbreviation
+""").df()
 state_export.to_csv(PROCESSED_DATA_PATH / 'state_summary.csv', index=False)
 print(f"      {len(state_export)} states/territories")
 
 print("\n[5/8] Exporting occupation summary...")
-occupation_export = df.groupby(['occupational_group', 'occupational_series', 'stem_occupation']).agg({
-    'count': 'sum',
-    'pay_numeric': ['mean', 'median'],
-    'length_of_service_years': 'mean',
-    'grade_numeric': 'mean'
-}).round(2)
-occupation_export.columns = ['_'.join(col).strip('_') for col in occupation_export.columns]
-occupation_export = occupation_export.reset_index()
+occupation_export = con.execute("""
+    SELECT occupational_group,
+           occupational_series,
+           stem_occupation,
+           CAST(SUM("count") AS BIGINT) AS count_sum,
+           ROUND(AVG(pay_numeric), 2) AS pay_numeric_mean,
+           ROUND(MEDIAN(pay_numeric), 2) AS pay_numeric_median,
+           ROUND(AVG(length_of_service_years), 2) AS length_of_service_years_mean,
+           ROUND(AVG(grade_numeric), 2) AS grade_numeric_mean
+    FROM emp
+    GROUP BY occupational_group, occupational_series, stem_occupation
+""").df()
 occupation_export.to_csv(PROCESSED_DATA_PATH / 'occupation_summary.csv', index=False)
 print(f"      {len(occupation_export)} occupation series")
 
 print("\n[6/8] Exporting demographics summary...")
-demographics_export = df.groupby(['age_bracket', 'education_level', 'tenure_category']).agg({
-    'count': 'sum',
-    'pay_numeric': 'mean'
-}).round(2)
-demographics_export.columns = ['employee_count', 'avg_pay']
-demographics_export = demographics_export.reset_index()
+demographics_export = con.execute("""
+    SELECT age_bracket,
+           education_level,
+           tenure_category,
+           CAST(SUM(employees) AS BIGINT) AS employee_count,
+           ROUND(SUM(pay_sum) / NULLIF(SUM(pay_n), 0), 2) AS avg_pay
+    FROM cube
+    GROUP BY age_bracket, education_level, tenure_category
+""").df()
 demographics_export.to_csv(PROCESSED_DATA_PATH / 'demographics_summary.csv', index=False)
 print(f"      {len(demographics_export)} demographic combinations")
 
 print("\n[7/8] Exporting pay distribution and appointment data...")
-pay_distribution = df.groupby(['pay_band', 'agency']).agg({'count': 'sum'}).reset_index()
+pay_distribution = con.execute("""
+    SELECT pay_band,
+           agency,
+           CAST(SUM(employees) AS BIGINT) AS "count"
+    FROM cube
+    GROUP BY pay_band, agency
+""").df()
 pay_distribution.to_csv(PROCESSED_DATA_PATH / 'pay_distribution.csv', index=False)
 print(f"      {len(pay_distribution)} pay distribution rows")
 
-appointment_export = df.groupby(['appointment_type', 'agency']).agg({
-    'count': 'sum',
-    'pay_numeric': 'mean',
-    'length_of_service_years': 'mean'
-}).round(2)
-appointment_export.columns = ['employee_count', 'avg_pay', 'avg_tenure']
-appointment_export = appointment_export.reset_index()
+appointment_export = con.execute("""
+    SELECT appointment_type,
+           agency,
+           CAST(SUM(employees) AS BIGINT) AS employee_count,
+           ROUND(SUM(pay_sum) / NULLIF(SUM(pay_n), 0), 2) AS avg_pay,
+           ROUND(SUM(ten_sum) / NULLIF(SUM(ten_n), 0), 2) AS avg_tenure
+    FROM cube
+    GROUP BY appointment_type, agency
+""").df()
 appointment_export.to_csv(PROCESSED_DATA_PATH / 'appointment_summary.csv', index=False)
 print(f"      {len(appointment_export)} appointment type rows")
 
 print("\n[8/8] Exporting overall statistics...")
+totals = con.execute("""
+    SELECT CAST(SUM("count") AS BIGINT) AS total_employees,
+           COUNT(DISTINCT agency) AS total_agencies,
+           COUNT(DISTINCT duty_station_state) AS total_states,
+           ROUND(AVG(pay_numeric), 2) AS avg_salary,
+           -- MEDIAN over FLOAT stays FLOAT, so cast before rounding or the
+           -- JSON picks up float32 representation artifacts
+           ROUND(CAST(MEDIAN(pay_numeric) AS DOUBLE), 2) AS median_salary,
+           ROUND(AVG(length_of_service_years), 2) AS avg_tenure,
+           ROUND(100.0 * SUM(CASE WHEN is_redacted THEN 1 ELSE 0 END) / COUNT(*), 2) AS pct_redacted,
+           ANY_VALUE(snapshot_yyyymm) AS snapshot_date
+    FROM emp
+""").fetchone()
 overall_stats = {
-    'total_employees': int(df['count'].sum()),
-    'total_agencies': int(df['agency'].nunique()),
-    'total_states': int(df['duty_station_state'].nunique()),
-    'avg_salary': round(float(df['pay_numeric'].mean()), 2),
-    'median_salary': round(float(df['pay_numeric'].median()), 2),
-    'avg_tenure': round(float(df['length_of_service_years'].mean()), 2),
-    'pct_redacted': round(float(df['is_redacted'].mean() * 100), 2),
-    'snapshot_date': int(df['snapshot_yyyymm'].iloc[0])
+    'total_employees': int(totals[0]),
+    'total_agencies': int(totals[1]),
+    'total_states': int(totals[2]),
+    'avg_salary': float(totals[3]),
+    'median_salary': float(totals[4]),
+    'avg_tenure': float(totals[5]),
+    'pct_redacted': float(totals[6]),
+    'snapshot_date': int(totals[7])
 }
 
 with open(PROCESSED_DATA_PATH / 'overall_stats.json', 'w') as f: